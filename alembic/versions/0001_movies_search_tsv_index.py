@@ -0,0 +1,37 @@
+"""Add GIN full-text index for movie search
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    # Must match app.models.movie.search_vector so the planner uses the index
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS movies_search_tsv_idx ON movies USING gin "
+        "(to_tsvector('english', coalesce(title, '') || ' ' || "
+        "coalesce(description, '') || ' ' || coalesce(director, '')))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS movies_search_tsv_idx")
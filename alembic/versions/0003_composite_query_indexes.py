@@ -0,0 +1,48 @@
+"""Add composite indexes for filtered listings, top-rated and ratings lookups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-14 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db may already have built these from the models, so each step tolerates that
+    # ix_movies_genre was a single-column index; it now also covers the id keyset
+    op.drop_index("ix_movies_genre", table_name="movies", if_exists=True)
+    op.create_index("ix_movies_genre", "movies", ["genre", "id"])
+    op.create_index("ix_movies_year", "movies", ["year", "id"], if_not_exists=True)
+    op.create_index(
+        "ix_movies_top_rated", "movies", [sa.text("average_rating DESC")],
+        postgresql_where=sa.text("total_ratings > 0"),
+        sqlite_where=sa.text("total_ratings > 0"),
+        if_not_exists=True,
+    )
+    # Fails if duplicate (user_id, movie_id) ratings exist; remove them first
+    op.create_index("ix_ratings_user_movie", "ratings", ["user_id", "movie_id"], unique=True, if_not_exists=True)
+    op.create_index("ix_ratings_user", "ratings", ["user_id", "id"], if_not_exists=True)
+    op.create_index("ix_ratings_movie", "ratings", ["movie_id", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ratings_movie", table_name="ratings", if_exists=True)
+    op.drop_index("ix_ratings_user", table_name="ratings", if_exists=True)
+    op.drop_index("ix_ratings_user_movie", table_name="ratings", if_exists=True)
+    op.drop_index("ix_movies_top_rated", table_name="movies", if_exists=True)
+    op.drop_index("ix_movies_year", table_name="movies", if_exists=True)
+    op.drop_index("ix_movies_genre", table_name="movies", if_exists=True)
+    op.create_index("ix_movies_genre", "movies", ["genre"], if_not_exists=True)
@@ -0,0 +1,38 @@
+"""Add movie_similarities table for precomputed similar movies
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-14 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "movie_similarities",
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("neighbor_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("score", sa.Float(), nullable=False),
+        if_not_exists=True,  # init_db may have created it already
+    )
+    op.create_index(
+        "ix_movie_similarities_movie_score", "movie_similarities", ["movie_id", "score"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_movie_similarities_movie_score", table_name="movie_similarities", if_exists=True)
+    op.drop_table("movie_similarities", if_exists=True)
@@ -0,0 +1,28 @@
+"""Add covering (movie_id, rating) index for per-movie rating aggregates
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-14 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db may have created it already
+    op.create_index("ix_ratings_movie_rating", "ratings", ["movie_id", "rating"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ratings_movie_rating", table_name="ratings", if_exists=True)
@@ -1,17 +1,59 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import time
+from collections import OrderedDict
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional, Sequence, Tuple
+from ..core.config import settings
 from ..core.database import get_db
 from ..core.security import verify_token
 from ..crud.user import get_user, get_user_by_username
 from ..models.user import User
+from ..utils.pagination import decode_cursor, next_cursor
 
 security = HTTPBearer()
 
+# Access token -> (user, cache expiry); bounded LRU, local to the process
+_token_users: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+TOKEN_USER_CACHE_SIZE = 10000
 
-def get_current_user(
-    db: Session = Depends(get_db),
+
+async def get_user_for_token(db: AsyncSession, token: str) -> Optional[User]:
+    """Resolve a bearer token to its user, caching the decode and lookup briefly.
+
+    Entries live for settings.auth_cache_seconds and never past the token's exp,
+    so changes such as deactivating a user apply within that window.
+    """
+    now = time.time()
+    cached = _token_users.get(token)
+    if cached is not None:
+        user, expires_at = cached
+        if expires_at > now:
+            _token_users.move_to_end(token)
+            return user
+        del _token_users[token]
+    
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    
+    user = await get_user_by_username(db, username=username)
+    if user is None:
+        return None
+    
+    _token_users[token] = (user, min(now + settings.auth_cache_seconds, payload.get("exp", now)))
+    if len(_token_users) > TOKEN_USER_CACHE_SIZE:
+        _token_users.popitem(last=False)
+    return user
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """Get current authenticated user."""
@@ -21,43 +63,63 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = verify_token(credentials.credentials)
-    if payload is None:
-        raise credentials_exception
-    
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-    
-    user = get_user_by_username(db, username=username)
+    user = await get_user_for_token(db, credentials.credentials)
     if user is None:
         raise credentials_exception
     
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-def get_optional_current_user(
-    db: Session = Depends(get_db),
+async def get_optional_current_user(
+    db: AsyncSession = Depends(get_db),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
 ) -> Optional[User]:
     """Get current user if authenticated, otherwise None."""
     if not credentials:
         return None
     
-    payload = verify_token(credentials.credentials)
-    if payload is None:
-        return None
-    
-    username: str = payload.get("sub")
-    if username is None:
-        return None
-    
-    user = get_user_by_username(db, username=username)
+    user = await get_user_for_token(db, credentials.credentials)
     return user if user and user.is_active else None
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
+) -> Optional[int]:
+    """Decode the keyset pagination cursor into the last seen row ID."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Expose the cursor for the next page via the X-Next-Cursor header."""
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+
+def etag_response(request: Request, content: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Return a JSON body with a weak ETag, or an empty 304 if the client already has it."""
+    etag = f'W/"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+    headers = {**(headers or {}), "ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
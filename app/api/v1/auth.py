@@ -1,10 +1,8 @@
-from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.database import get_db
-from ...core.security import create_access_token
-from ...core.config import settings
+from ...core.security import ACCESS_TOKEN_EXPIRES, create_access_token
 from ...crud.user import authenticate_user, create_user, get_user_by_email, get_user_by_username
 from ...schemas.user import UserCreate, User, Token, UserLogin
 
@@ -12,28 +10,28 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=User)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     # Check if user already exists
-    if get_user_by_email(db, email=user.email):
+    if await get_user_by_email(db, email=user.email):
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    if get_user_by_username(db, username=user.username):
+    if await get_user_by_username(db, username=user.username):
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
         )
     
-    return create_user(db=db, user=user)
+    return await create_user(db=db, user=user)
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Login user and return access token (form data)."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,19 +39,18 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username}, expires_delta=ACCESS_TOKEN_EXPIRES
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login-json", response_model=Token)
-def login_json(user_login: UserLogin, db: Session = Depends(get_db)):
+async def login_json(user_login: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user and return access token (JSON data with email)."""
     # Use email to authenticate user
-    user = authenticate_user(db, user_login.email, user_login.password)
+    user = await authenticate_user(db, user_login.email, user_login.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,9 +58,8 @@ def login_json(user_login: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username}, expires_delta=ACCESS_TOKEN_EXPIRES
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
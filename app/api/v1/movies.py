@@ -1,116 +1,263 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ...core.database import get_db
+from pydantic import TypeAdapter
+from ...core import cache
+from ...core.config import settings
+from ...core.database import get_db, SessionLocal
 from ...crud.movie import (
-    get_movie, get_movies, get_movies_by_genre, search_movies,
-    get_movies_by_year, get_top_rated_movies, create_movie, update_movie, delete_movie
+    get_movie, get_movies, count_movies, get_movies_by_genre, search_movies, autocomplete_movies,
+    get_movies_by_year, get_recent_movies, get_genres, get_top_rated_movies,
+    create_movie, update_movie, delete_movie
+)
+from ...crud.rating import get_movie_rating_stats
+from ...ml.content_based import get_similar_movies
+from ...schemas.movie import Movie, MovieList, MovieCreate, MovieUpdate, MovieSearch
+from ...api.deps import (
+    get_current_active_user, get_optional_current_user, get_cursor, set_next_cursor, etag_response
 )
-from ...schemas.movie import Movie, MovieCreate, MovieUpdate, MovieSearch
-from ...api.deps import get_current_active_user, get_optional_current_user
 from ...models.user import User
 
 router = APIRouter()
 
+movie_list_adapter = TypeAdapter(List[MovieList])
+
+
+def movie_list_response(movies, request: Request, response: Response) -> Response:
+    """Serialize list endpoint rows straight to JSON bytes, with an ETag.
+
+    Skips FastAPI's response_model pass (validate, dump to dicts, encode again);
+    headers already set on the injected response are carried over.
+    """
+    content = movie_list_adapter.dump_json(movie_list_adapter.validate_python(movies, from_attributes=True))
+    return etag_response(request, content, headers=dict(response.headers))
 
-@router.get("/", response_model=List[Movie])
-def read_movies(
+
+@router.get("/", response_model=List[MovieList])
+async def read_movies(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=100, le=100),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    include_total: bool = Query(default=False, description="Return the total count in X-Total-Count"),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get list of movies."""
-    movies = get_movies(db, skip=skip, limit=limit)
-    return movies
+    if include_total:
+        # Count on its own session so both queries can run concurrently
+        async with SessionLocal() as count_db:
+            movies, total = await asyncio.gather(
+                get_movies(db, skip=skip, limit=limit, after_id=after_id, summary=True),
+                count_movies(count_db)
+            )
+        response.headers["X-Total-Count"] = str(total)
+    else:
+        movies = await get_movies(db, skip=skip, limit=limit, after_id=after_id, summary=True)
+    set_next_cursor(response, movies, limit)
+    return movie_list_response(movies, request, response)
+
 
+async def top_rated_payload(db: AsyncSession, limit: int) -> bytes:
+    """Cached JSON for the top rated movies, shared by the top-rated and trending routes."""
+    async def build():
+        movies = await get_top_rated_movies(db, limit=limit, summary=True)
+        return movie_list_adapter.dump_python(
+            movie_list_adapter.validate_python(movies, from_attributes=True), mode="json"
+        )
+    
+    return await cache.get_or_set_json(
+        "top_rated", f"limit={limit}", build, local_expire=settings.local_cache_expire_seconds
+    )
 
-@router.get("/top-rated", response_model=List[Movie])
-def read_top_rated_movies(
+
+@router.get("/top-rated", response_model=List[MovieList])
+async def read_top_rated_movies(
+    request: Request,
     limit: int = Query(default=10, le=50),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get top rated movies."""
-    movies = get_top_rated_movies(db, limit=limit)
-    return movies
+    return etag_response(request, await top_rated_payload(db, limit))
+
+
+@router.get("/trending", response_model=List[MovieList])
+async def read_trending_movies(
+    request: Request,
+    limit: int = Query(default=10, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get trending movies (currently the top rated ones)."""
+    return etag_response(request, await top_rated_payload(db, limit))
+
+
+@router.get("/recent", response_model=List[MovieList])
+async def read_recent_movies(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=20, le=100),
+    years_back: int = Query(default=2, ge=0, description="How many years back counts as recent"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get recently released movies."""
+    movies = await get_recent_movies(db, years_back=years_back, limit=limit, summary=True)
+    return movie_list_response(movies, request, response)
+
 
+@router.get("/genres", response_model=List[str])
+async def read_genres(request: Request, db: AsyncSession = Depends(get_db)):
+    """Get all movie genres."""
+    async def build():
+        return await get_genres(db)
+    
+    return etag_response(request, await cache.get_or_set_json("genres", "all", build))
 
-@router.get("/search", response_model=List[Movie])
-def search_movies_endpoint(
+
+@router.get("/search", response_model=List[MovieList])
+async def search_movies_endpoint(
+    request: Request,
+    response: Response,
     query: str = Query(..., min_length=1),
     skip: int = 0,
     limit: int = Query(default=20, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Search movies by title, description, or director."""
-    movies = search_movies(db, query=query, skip=skip, limit=limit)
-    return movies
+    movies = await search_movies(db, query=query, skip=skip, limit=limit, summary=True)
+    return movie_list_response(movies, request, response)
+
+
+@router.get("/autocomplete", response_model=List[MovieList])
+async def autocomplete_movies_endpoint(
+    request: Request,
+    response: Response,
+    query: str = Query(..., min_length=1),
+    limit: int = Query(default=10, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Suggest movies from a partial or misspelled title."""
+    movies = await autocomplete_movies(db, query=query, limit=limit, summary=True)
+    return movie_list_response(movies, request, response)
 
 
-@router.get("/genre/{genre}", response_model=List[Movie])
-def read_movies_by_genre(
+@router.get("/genre/{genre}", response_model=List[MovieList])
+async def read_movies_by_genre(
     genre: str,
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=20, le=100),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get movies by genre."""
-    movies = get_movies_by_genre(db, genre=genre, skip=skip, limit=limit)
-    return movies
+    movies = await get_movies_by_genre(db, genre=genre, skip=skip, limit=limit, after_id=after_id, summary=True)
+    set_next_cursor(response, movies, limit)
+    return movie_list_response(movies, request, response)
 
 
-@router.get("/year/{year}", response_model=List[Movie])
-def read_movies_by_year(
+@router.get("/year/{year}", response_model=List[MovieList])
+async def read_movies_by_year(
     year: int,
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = Query(default=20, le=100),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get movies by year."""
-    movies = get_movies_by_year(db, year=year, skip=skip, limit=limit)
-    return movies
+    movies = await get_movies_by_year(db, year=year, skip=skip, limit=limit, after_id=after_id, summary=True)
+    set_next_cursor(response, movies, limit)
+    return movie_list_response(movies, request, response)
 
 
 @router.get("/{movie_id}", response_model=Movie)
-def read_movie(movie_id: int, db: Session = Depends(get_db)):
+async def read_movie(movie_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """Get movie by ID."""
-    movie = get_movie(db, movie_id=movie_id)
+    async def build():
+        movie = await get_movie(db, movie_id=movie_id)
+        if movie is None:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        return Movie.model_validate(movie).model_dump(mode="json")
+    
+    payload = await cache.get_or_set_json("movie", str(movie_id), build)
+    return etag_response(request, payload)
+
+
+@router.get("/{movie_id}/similar", response_model=List[MovieList])
+async def read_similar_movies(
+    movie_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(default=10, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get movies similar to a given movie."""
+    # Existence check on its own session so both queries can run concurrently
+    async with SessionLocal() as movie_db:
+        movie, movies = await asyncio.gather(
+            get_movie(movie_db, movie_id=movie_id),
+            get_similar_movies(db, movie_id, limit)
+        )
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+    return movie_list_response(movies, request, response)
+
+
+@router.get("/{movie_id}/stats")
+async def read_movie_stats(movie_id: int, db: AsyncSession = Depends(get_db)):
+    """Get live rating statistics for a movie."""
+    # Stats on their own session so both queries can run concurrently
+    async with SessionLocal() as stats_db:
+        movie, stats = await asyncio.gather(
+            get_movie(db, movie_id=movie_id),
+            get_movie_rating_stats(stats_db, movie_id)
+        )
+    if movie is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return {
+        "movie_id": movie.id,
+        "title": movie.title,
+        "genre": movie.genre,
+        "year": movie.year,
+        **stats,
+    }
 
 
 @router.post("/", response_model=Movie)
-def create_movie_endpoint(
+async def create_movie_endpoint(
     movie: MovieCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new movie (admin only)."""
-    return create_movie(db=db, movie=movie)
+    return await create_movie(db=db, movie=movie)
 
 
 @router.put("/{movie_id}", response_model=Movie)
-def update_movie_endpoint(
+async def update_movie_endpoint(
     movie_id: int,
     movie_update: MovieUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a movie (admin only)."""
-    movie = update_movie(db, movie_id=movie_id, movie_update=movie_update)
+    movie = await update_movie(db, movie_id=movie_id, movie_update=movie_update)
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
     return movie
 
 
 @router.delete("/{movie_id}")
-def delete_movie_endpoint(
+async def delete_movie_endpoint(
     movie_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a movie (admin only)."""
-    success = delete_movie(db, movie_id=movie_id)
+    success = await delete_movie(db, movie_id=movie_id)
     if not success:
         raise HTTPException(status_code=404, detail="Movie not found")
     return {"message": "Movie deleted successfully"}
@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from ...core import cache
 from ...core.database import get_db
 from ...schemas.recommendation import (
     RecommendationRequest, RecommendationResponse,
     SimilarMoviesRequest, SimilarMoviesResponse
 )
-from ...schemas.movie import Movie
-from ...api.deps import get_current_active_user
+from ...schemas.movie import MovieList
+from ...api.deps import get_current_active_user, etag_response
 from ...models.user import User
 from ...ml.hybrid import get_hybrid_recommendations
 from ...ml.collaborative import get_collaborative_recommendations
 from ...ml.content_based import get_content_based_recommendations, get_similar_movies
+from .movies import top_rated_payload
 
 router = APIRouter()
 
 
 @router.post("/", response_model=RecommendationResponse)
-def get_recommendations(
+async def get_recommendations(
     request: RecommendationRequest,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get movie recommendations for a user."""
     # Verify user can only get recommendations for themselves
@@ -29,15 +31,15 @@ def get_recommendations(
     
     try:
         if request.algorithm == "collaborative":
-            recommendations = get_collaborative_recommendations(
+            recommendations = await get_collaborative_recommendations(
                 db, request.user_id, request.limit
             )
         elif request.algorithm == "content_based":
-            recommendations = get_content_based_recommendations(
+            recommendations = await get_content_based_recommendations(
                 db, request.user_id, request.limit
             )
         elif request.algorithm == "hybrid":
-            recommendations = get_hybrid_recommendations(
+            recommendations = await get_hybrid_recommendations(
                 db, request.user_id, request.limit
             )
         else:
@@ -57,27 +59,31 @@ def get_recommendations(
 
 
 @router.post("/similar", response_model=SimilarMoviesResponse)
-def get_similar_movies_endpoint(
+async def get_similar_movies_endpoint(
     request: SimilarMoviesRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get movies similar to a given movie."""
-    try:
-        similar_movies = get_similar_movies(db, request.movie_id, request.limit)
+    async def build():
+        similar_movies = await get_similar_movies(db, request.movie_id, request.limit)
         return SimilarMoviesResponse(
             movie_id=request.movie_id,
             similar_movies=similar_movies
-        )
+        ).model_dump(mode="json")
+    
+    try:
+        payload = await cache.get_or_set_json("similar", f"{request.movie_id}:limit={request.limit}", build)
+        return Response(content=payload, media_type="application/json")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding similar movies: {str(e)}")
 
 
-@router.get("/trending", response_model=List[Movie])
-def get_trending_movies(
-    limit: int = 10,
-    db: Session = Depends(get_db)
+@router.get("/trending", response_model=List[MovieList])
+async def get_trending_movies(
+    request: Request,
+    limit: int = Query(default=10, le=50),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get trending movies based on recent ratings."""
-    from ...crud.movie import get_top_rated_movies
-    return get_top_rated_movies(db, limit=limit)
+    return etag_response(request, await top_rated_payload(db, limit))
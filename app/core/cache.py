@@ -0,0 +1,185 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cache"
+
+
+class MemoryBackend:
+    """Per-process stand-in for Redis, used when no redis_url is configured."""
+
+    max_entries = 10000
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+    async def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value, ex: Optional[int] = None):
+        if len(self._data) >= self.max_entries:
+            self._purge()
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (value, expires_at)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        self._data[key] = (value, None)
+        return value
+
+    async def close(self):
+        self._data.clear()
+
+    def _purge(self):
+        now = time.monotonic()
+        for key, (_, expires_at) in list(self._data.items()):
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+        if len(self._data) >= self.max_entries:
+            self._data.clear()
+
+
+_backend = None
+
+# Worker-local copies of hot entries: namespace -> key -> (value, expires_at)
+_local: Dict[str, Dict[str, Tuple[bytes, float]]] = {}
+
+# Worker-local copies of namespace versions: namespace -> (version, expires_at)
+_versions: Dict[str, Tuple[int, float]] = {}
+
+
+def get_backend():
+    """Return the cache backend, connecting to Redis on first use if configured."""
+    global _backend
+    if _backend is None:
+        if settings.redis_url:
+            import redis.asyncio as redis
+            _backend = redis.from_url(settings.redis_url)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+async def close():
+    """Close the cache backend connection."""
+    global _backend
+    _local.clear()
+    _versions.clear()
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def _remember_version(namespace: str, version: int):
+    _versions[namespace] = (version, time.monotonic() + settings.cache_version_local_seconds)
+
+
+async def _namespace_version(namespace: str) -> int:
+    """Namespace version, reused locally for a moment so a cache hit is one round trip.
+
+    This worker's own invalidations update the local copy at once; other workers'
+    reach it within cache_version_local_seconds.
+    """
+    local = _versions.get(namespace)
+    if local is not None and local[1] > time.monotonic():
+        return local[0]
+    version = await get_backend().get(f"{KEY_PREFIX}:{namespace}:version")
+    version = int(version) if version else 0
+    _remember_version(namespace, version)
+    return version
+
+
+async def _versioned_key(namespace: str, key: str) -> str:
+    return f"{KEY_PREFIX}:{namespace}:{await _namespace_version(namespace)}:{key}"
+
+
+async def get_version(namespace: str) -> int:
+    """Current version of a namespace: bumped by every invalidate(), 0 on a cache error."""
+    try:
+        return await _namespace_version(namespace)
+    except Exception as e:
+        logger.warning("Cache version lookup failed for %s: %s", namespace, e)
+        return 0
+
+
+async def get(namespace: str, key: str) -> Optional[bytes]:
+    """Get a cached value, or None on a miss or cache error."""
+    try:
+        return await get_backend().get(await _versioned_key(namespace, key))
+    except Exception as e:
+        logger.warning("Cache get failed for %s:%s: %s", namespace, key, e)
+        return None
+
+
+async def set(namespace: str, key: str, value: bytes, expire: Optional[int] = None):
+    """Store a value; expire defaults to settings.cache_expire_seconds."""
+    try:
+        await get_backend().set(
+            await _versioned_key(namespace, key), value,
+            ex=expire or settings.cache_expire_seconds
+        )
+    except Exception as e:
+        logger.warning("Cache set failed for %s:%s: %s", namespace, key, e)
+
+
+async def delete(namespace: str, key: str):
+    """Drop a single cached value."""
+    try:
+        await get_backend().delete(await _versioned_key(namespace, key))
+    except Exception as e:
+        logger.warning("Cache delete failed for %s:%s: %s", namespace, key, e)
+
+
+async def invalidate(namespace: str):
+    """Invalidate every value in a namespace by bumping its version."""
+    _local.pop(namespace, None)
+    try:
+        _remember_version(namespace, int(await get_backend().incr(f"{KEY_PREFIX}:{namespace}:version")))
+    except Exception as e:
+        _versions.pop(namespace, None)
+        logger.warning("Cache invalidate failed for %s: %s", namespace, e)
+
+
+async def get_or_set_json(
+    namespace: str,
+    key: str,
+    factory: Callable[[], Awaitable[Any]],
+    expire: Optional[int] = None,
+    local_expire: Optional[int] = None
+) -> bytes:
+    """Return the cached JSON for key, building and storing it with factory on a miss.
+
+    With local_expire, the value is also kept in this worker for that many seconds,
+    skipping the backend round trip. Invalidations from other workers reach it only
+    once the local copy expires.
+    """
+    if local_expire:
+        local = _local.get(namespace, {}).get(key)
+        if local is not None and local[1] > time.monotonic():
+            return local[0]
+    
+    payload = await get(namespace, key)
+    if payload is None:
+        payload = orjson.dumps(await factory())
+        await set(namespace, key, payload, expire)
+    
+    if local_expire:
+        _local.setdefault(namespace, {})[key] = (payload, time.monotonic() + local_expire)
+    return payload
@@ -1,28 +1,43 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+    
     # App settings
     app_name: str = "Movie Recommender API"
     debug: bool = False
     version: str = "1.0.0"
     
     # Database settings
-    database_url: str = "sqlite:///./movie_recommender.db"
+    database_url: str = "sqlite+aiosqlite:///./movie_recommender.db"
     
     # Security settings
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    auth_cache_seconds: int = 60  # how long a validated token's user is reused
+    
+    # Cache settings
+    redis_url: Optional[str] = None  # in-process cache when unset
+    cache_expire_seconds: int = 300
+    local_cache_expire_seconds: int = 30  # worker-local copies of the hottest entries
+    cache_version_local_seconds: float = 2.0  # worker-local copies of namespace versions
+    rating_stats_refresh_seconds: int = 60
+    recommendation_cache_seconds: int = 120  # hybrid results per user and limit
     
     # ML settings
     model_path: str = "./models/"
     min_ratings_per_user: int = 5
     min_ratings_per_movie: int = 3
-    
-    class Config:
-        env_file = ".env"
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsed from the environment once."""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,96 +1,263 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import Optional, List
-from ..models.movie import Movie
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy import select, insert, update, delete, or_, and_, func, literal_column
+from typing import Iterable, Optional, List
+from ..core import cache
+from ..core.database import is_postgresql
+from ..models.movie import Movie, search_vector
+from ..models.movie_similarity import MovieSimilarity
 from ..schemas.movie import MovieCreate, MovieUpdate
 
 
-def get_movie(db: Session, movie_id: int) -> Optional[Movie]:
+# Columns needed by the MovieList schema; summary queries skip the wide text columns
+MOVIE_LIST_COLUMNS = (
+    Movie.id, Movie.title, Movie.genre, Movie.director, Movie.year,
+    Movie.duration, Movie.average_rating, Movie.total_ratings
+)
+
+
+def _select_movies(summary: bool = False):
+    stmt = select(Movie)
+    if summary:
+        stmt = stmt.options(load_only(*MOVIE_LIST_COLUMNS, raiseload=True))
+    return stmt
+
+
+async def get_movie(db: AsyncSession, movie_id: int) -> Optional[Movie]:
     """Get movie by ID."""
-    return db.query(Movie).filter(Movie.id == movie_id).first()
+    result = await db.execute(select(Movie).where(Movie.id == movie_id))
+    return result.scalar_one_or_none()
+
+
+async def get_movies_by_ids(db: AsyncSession, movie_ids: List[int]) -> List[Movie]:
+    """Get movies by ID in one IN query, returned in the order given (missing IDs skipped)."""
+    if not movie_ids:
+        return []
+    result = await db.execute(select(Movie).where(Movie.id.in_(movie_ids)))
+    by_id = {movie.id: movie for movie in result.scalars()}
+    return [by_id[movie_id] for movie_id in movie_ids if movie_id in by_id]
+
+
+def _after(stmt, after_id: Optional[int]):
+    """Apply keyset pagination: only rows past the last seen ID, in ID order."""
+    if after_id is not None:
+        stmt = stmt.where(Movie.id > after_id)
+    return stmt.order_by(Movie.id)
 
 
-def get_movies(db: Session, skip: int = 0, limit: int = 100):
+async def get_movies(
+    db: AsyncSession, skip: int = 0, limit: Optional[int] = 100, after_id: Optional[int] = None, summary: bool = False
+):
     """Get multiple movies."""
-    return db.query(Movie).offset(skip).limit(limit).all()
+    result = await db.execute(_after(_select_movies(summary), after_id).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
-def get_movies_by_genre(db: Session, genre: str, skip: int = 0, limit: int = 100):
+async def count_movies(db: AsyncSession) -> int:
+    """Count all movies (bare table count, no ORDER BY or joins)."""
+    result = await db.execute(select(func.count()).select_from(Movie))
+    return result.scalar_one()
+
+
+async def get_movies_version(db: AsyncSession) -> tuple:
+    """Version of the movies' content, for refitting derived features.
+
+    The "movie_content" counter is bumped by every create, update and delete made
+    through this module; the table aggregates also catch writes that bypass it
+    (bulk loads, other tools).
+    """
+    result = await db.execute(select(func.count(), func.max(Movie.id), func.max(Movie.updated_at)).select_from(Movie))
+    return (await cache.get_version("movie_content"),) + tuple(result.one())
+
+
+async def get_movies_by_genre(
+    db: AsyncSession, genre: str, skip: int = 0, limit: int = 100,
+    after_id: Optional[int] = None, summary: bool = False
+):
     """Get movies by genre."""
-    return db.query(Movie).filter(Movie.genre == genre).offset(skip).limit(limit).all()
+    result = await db.execute(
+        _after(_select_movies(summary).where(Movie.genre == genre), after_id).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
 
 
-def search_movies(db: Session, query: str, skip: int = 0, limit: int = 100):
+async def search_movies(db: AsyncSession, query: str, skip: int = 0, limit: int = 100, summary: bool = False):
     """Search movies by title, description, or director."""
-    return db.query(Movie).filter(
-        or_(
-            Movie.title.contains(query),
-            Movie.description.contains(query),
-            Movie.director.contains(query)
+    if is_postgresql(db):
+        # Full-text search served by the movies_search_tsv_idx GIN index
+        ts_query = func.plainto_tsquery(literal_column("'english'"), query)
+        stmt = _select_movies(summary).where(
+            search_vector.bool_op("@@")(ts_query)
+        ).order_by(func.ts_rank(search_vector, ts_query).desc(), Movie.id)
+    else:
+        stmt = _select_movies(summary).where(
+            or_(
+                Movie.title.contains(query),
+                Movie.description.contains(query),
+                Movie.director.contains(query)
+            )
         )
-    ).offset(skip).limit(limit).all()
+    
+    result = await db.execute(stmt.offset(skip).limit(limit))
+    return result.scalars().all()
 
 
-def get_movies_by_year(db: Session, year: int, skip: int = 0, limit: int = 100):
+async def autocomplete_movies(db: AsyncSession, query: str, limit: int = 10, summary: bool = False):
+    """Match movies by partial or misspelled title."""
+    title_match = Movie.title.icontains(query, autoescape=True)
+    if is_postgresql(db):
+        # Both predicates are served by the movies_title_trgm GIN index
+        stmt = _select_movies(summary).where(
+            or_(title_match, Movie.title.bool_op("%")(query))
+        ).order_by(func.similarity(Movie.title, query).desc(), Movie.id)
+    else:
+        stmt = _select_movies(summary).where(title_match).order_by(Movie.title)
+    
+    result = await db.execute(stmt.limit(limit))
+    return result.scalars().all()
+
+
+async def get_movies_by_year(
+    db: AsyncSession, year: int, skip: int = 0, limit: int = 100,
+    after_id: Optional[int] = None, summary: bool = False
+):
     """Get movies by year."""
-    return db.query(Movie).filter(Movie.year == year).offset(skip).limit(limit).all()
+    result = await db.execute(
+        _after(_select_movies(summary).where(Movie.year == year), after_id).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_recent_movies(db: AsyncSession, years_back: int = 2, limit: int = 20, summary: bool = False):
+    """Get movies released in the last years_back years, newest first."""
+    result = await db.execute(
+        _select_movies(summary)
+        .where(Movie.year >= date.today().year - years_back)
+        .order_by(Movie.year.desc(), Movie.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
 
 
-def get_top_rated_movies(db: Session, limit: int = 10):
+async def get_genres(db: AsyncSession) -> List[str]:
+    """Get the distinct movie genres."""
+    result = await db.execute(
+        select(Movie.genre).where(Movie.genre.isnot(None)).distinct().order_by(Movie.genre)
+    )
+    return result.scalars().all()
+
+
+async def get_top_rated_movies(db: AsyncSession, limit: int = 10, summary: bool = False):
     """Get top rated movies."""
-    return db.query(Movie).filter(Movie.total_ratings > 0).order_by(Movie.average_rating.desc()).limit(limit).all()
+    result = await db.execute(
+        _select_movies(summary).where(Movie.total_ratings > 0).order_by(Movie.average_rating.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
 
+async def get_precomputed_similar_movies(db: AsyncSession, movie_id: int, limit: int = 10) -> List[Movie]:
+    """Get a movie's precomputed neighbours, most similar first (empty until the table is built)."""
+    result = await db.execute(
+        select(Movie)
+        .join(MovieSimilarity, MovieSimilarity.neighbor_id == Movie.id)
+        .where(MovieSimilarity.movie_id == movie_id)
+        .order_by(MovieSimilarity.score.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
 
-def create_movie(db: Session, movie: MovieCreate) -> Movie:
+
+async def replace_movie_similarities(db: AsyncSession, batches: Iterable[List[dict]]) -> int:
+    """Replace the whole similarity table with freshly computed rows in one transaction.
+
+    batches is consumed lazily, one insert per batch; returns the number of rows stored.
+    """
+    await db.execute(delete(MovieSimilarity))
+    stored = 0
+    for rows in batches:
+        if rows:
+            await db.execute(insert(MovieSimilarity), rows)
+            stored += len(rows)
+    await db.commit()
+    await cache.invalidate("similar")
+    return stored
+
+
+async def create_movie(db: AsyncSession, movie: MovieCreate) -> Movie:
     """Create a new movie."""
-    db_movie = Movie(**movie.dict())
+    db_movie = Movie(**movie.model_dump())
     db.add(db_movie)
-    db.commit()
-    db.refresh(db_movie)
+    await db.commit()
+    await db.refresh(db_movie)
+    await cache.invalidate("genres")
+    await cache.invalidate("movie_content")
+    await cache.invalidate("hybrid")  # new content-based candidate
     return db_movie
 
 
-def update_movie(db: Session, movie_id: int, movie_update: MovieUpdate) -> Optional[Movie]:
+async def update_movie(db: AsyncSession, movie_id: int, movie_update: MovieUpdate) -> Optional[Movie]:
     """Update movie information."""
-    db_movie = get_movie(db, movie_id)
+    db_movie = await get_movie(db, movie_id)
     if not db_movie:
         return None
     
-    update_data = movie_update.dict(exclude_unset=True)
+    update_data = movie_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_movie, field, value)
     
-    db.commit()
-    db.refresh(db_movie)
+    await db.commit()
+    await db.refresh(db_movie)
+    await invalidate_movie_cache(movie_id)
     return db_movie
 
 
-def delete_movie(db: Session, movie_id: int) -> bool:
+async def delete_movie(db: AsyncSession, movie_id: int) -> bool:
     """Delete a movie."""
-    db_movie = get_movie(db, movie_id)
+    db_movie = await get_movie(db, movie_id)
     if not db_movie:
         return False
     
-    db.delete(db_movie)
-    db.commit()
+    await db.delete(db_movie)
+    await db.commit()
+    await invalidate_movie_cache(movie_id)
     return True
 
 
-def update_movie_rating_stats(db: Session, movie_id: int):
-    """Update movie's average rating and total ratings count."""
+async def invalidate_movie_cache(movie_id: int):
+    """Drop cached responses that include the movie's details or rating stats."""
+    await cache.delete("movie", str(movie_id))
+    await cache.invalidate("genres")
+    await cache.invalidate("movie_content")
+    await cache.invalidate("top_rated")
+    await cache.invalidate("similar")
+    await cache.invalidate("hybrid")
+
+
+async def refresh_movie_rating_stats(db: AsyncSession) -> int:
+    """Recompute average rating and total ratings for every movie whose stats are stale.
+
+    Rating writes no longer touch the movies table; this runs periodically as one
+    set-based UPDATE and only rewrites rows whose aggregates changed. Returns the
+    number of movies updated.
+    """
     from ..models.rating import Rating
-    from sqlalchemy import func
     
-    stats = db.query(
-        func.avg(Rating.rating).label('avg_rating'),
-        func.count(Rating.id).label('total_ratings')
-    ).filter(Rating.movie_id == movie_id).first()
+    movie_ratings = Rating.movie_id == Movie.id
+    average = select(func.coalesce(func.avg(Rating.rating), 0.0)).where(movie_ratings).scalar_subquery()
+    total = select(func.count()).where(movie_ratings).scalar_subquery()
+    result = await db.execute(
+        update(Movie)
+        .where(or_(Movie.total_ratings.is_distinct_from(total), Movie.average_rating.is_distinct_from(average)))
+        # Keep updated_at (and so get_movies_version) for content edits only; skips its onupdate
+        .values(average_rating=average, total_ratings=total, updated_at=Movie.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
     
-    db_movie = get_movie(db, movie_id)
-    if db_movie:
-        db_movie.average_rating = float(stats.avg_rating) if stats.avg_rating else 0.0
-        db_movie.total_ratings = stats.total_ratings or 0
-        db.commit()
-        db.refresh(db_movie)
-        return db_movie
-    return None
+    if result.rowcount:
+        await cache.invalidate("movie")
+        await cache.invalidate("top_rated")
+        await cache.invalidate("similar")  # payloads embed each movie's rating stats
+        await cache.invalidate("hybrid")
+    return result.rowcount
@@ -1,94 +1,158 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
 from typing import Optional, List
+from ..core import cache
+from ..core.database import is_postgresql
 from ..models.rating import Rating
 from ..schemas.rating import RatingCreate, RatingUpdate
 
 
-def get_rating(db: Session, rating_id: int) -> Optional[Rating]:
+async def get_rating(db: AsyncSession, rating_id: int) -> Optional[Rating]:
     """Get rating by ID."""
-    return db.query(Rating).filter(Rating.id == rating_id).first()
+    result = await db.execute(select(Rating).where(Rating.id == rating_id))
+    return result.scalar_one_or_none()
 
 
-def get_user_rating_for_movie(db: Session, user_id: int, movie_id: int) -> Optional[Rating]:
-    """Get user's rating for a specific movie."""
-    return db.query(Rating).filter(
-        and_(Rating.user_id == user_id, Rating.movie_id == movie_id)
-    ).first()
+def _after(stmt, after_id: Optional[int]):
+    """Apply keyset pagination: only rows past the last seen ID, in ID order."""
+    if after_id is not None:
+        stmt = stmt.where(Rating.id > after_id)
+    return stmt.order_by(Rating.id)
 
 
-def get_user_ratings(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """Get all ratings by a user."""
-    return db.query(Rating).filter(Rating.user_id == user_id).offset(skip).limit(limit).all()
+async def get_user_ratings(
+    db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100,
+    after_id: Optional[int] = None, with_movie: bool = False
+):
+    """Get all ratings by a user, optionally with their movies in the same query."""
+    stmt = select(Rating).where(Rating.user_id == user_id)
+    if with_movie:
+        stmt = stmt.options(joinedload(Rating.movie))
+    result = await db.execute(_after(stmt, after_id).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
-def get_movie_ratings(db: Session, movie_id: int, skip: int = 0, limit: int = 100):
+async def get_movie_ratings(
+    db: AsyncSession, movie_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+):
     """Get all ratings for a movie."""
-    return db.query(Rating).filter(Rating.movie_id == movie_id).offset(skip).limit(limit).all()
+    result = await db.execute(
+        _after(select(Rating).where(Rating.movie_id == movie_id), after_id).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
 
 
-def get_ratings(db: Session, skip: int = 0, limit: int = 100):
+async def get_ratings(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
     """Get multiple ratings."""
-    return db.query(Rating).offset(skip).limit(limit).all()
+    result = await db.execute(_after(select(Rating), after_id).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
-def create_rating(db: Session, rating: RatingCreate) -> Rating:
-    """Create a new rating."""
-    db_rating = Rating(**rating.dict())
-    db.add(db_rating)
-    db.commit()
-    db.refresh(db_rating)
+async def count_ratings(db: AsyncSession) -> int:
+    """Count all ratings (bare table count, no ORDER BY or joins)."""
+    result = await db.execute(select(func.count()).select_from(Rating))
+    return result.scalar_one()
+
+
+async def get_ratings_version(db: AsyncSession) -> tuple:
+    """Cheap fingerprint of the ratings table that changes on insert, update and delete."""
+    result = await db.execute(
+        select(func.count(), func.max(Rating.id), func.max(Rating.updated_at)).select_from(Rating)
+    )
+    return tuple(result.one())
+
+
+async def get_movie_rating_stats(db: AsyncSession, movie_id: int) -> dict:
+    """Get a movie's live rating count, average and distribution by whole star."""
+    result = await db.execute(
+        select(Rating.rating, func.count()).where(Rating.movie_id == movie_id).group_by(Rating.rating)
+    )
+    counts = result.all()
     
-    # Update movie rating stats
-    from .movie import update_movie_rating_stats
-    update_movie_rating_stats(db, rating.movie_id)
+    total = sum(count for _, count in counts)
+    distribution = {stars: 0 for stars in range(1, 6)}
+    for rating, count in counts:
+        distribution[min(int(rating), 5)] += count
     
+    return {
+        "total_ratings": total,
+        "average_rating": sum(rating * count for rating, count in counts) / total if total else 0.0,
+        "rating_distribution": distribution,
+    }
+
+
+async def create_if_absent(db: AsyncSession, user_id: int, rating: RatingCreate) -> Optional[Rating]:
+    """Insert a user's rating in one statement; return None if they already rated the movie."""
+    insert = postgresql.insert if is_postgresql(db) else sqlite.insert
+    stmt = (
+        insert(Rating)
+        .values(user_id=user_id, **rating.model_dump())
+        .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+        .returning(Rating)
+    )
+    result = await db.execute(stmt)
+    db_rating = result.scalar_one_or_none()
+    if db_rating is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    await invalidate_rating_cache()
     return db_rating
 
 
-def update_rating(db: Session, rating_id: int, rating_update: RatingUpdate) -> Optional[Rating]:
+async def update_rating(db: AsyncSession, rating_id: int, rating_update: RatingUpdate) -> Optional[Rating]:
     """Update a rating."""
-    db_rating = get_rating(db, rating_id)
+    db_rating = await get_rating(db, rating_id)
     if not db_rating:
         return None
     
-    update_data = rating_update.dict(exclude_unset=True)
+    update_data = rating_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_rating, field, value)
-    
-    db.commit()
-    db.refresh(db_rating)
-    
-    # Update movie rating stats
-    from .movie import update_movie_rating_stats
-    update_movie_rating_stats(db, db_rating.movie_id)
-    
+    await db.commit()
+    await db.refresh(db_rating)
+    await invalidate_rating_cache()
     return db_rating
 
 
-def delete_rating(db: Session, rating_id: int) -> bool:
+async def delete_rating(db: AsyncSession, rating_id: int) -> bool:
     """Delete a rating."""
-    db_rating = get_rating(db, rating_id)
+    db_rating = await get_rating(db, rating_id)
     if not db_rating:
         return False
     
-    movie_id = db_rating.movie_id
-    db.delete(db_rating)
-    db.commit()
-    
-    # Update movie rating stats
-    from .movie import update_movie_rating_stats
-    update_movie_rating_stats(db, movie_id)
-    
+    await db.delete(db_rating)
+    await db.commit()
+    await invalidate_rating_cache()
     return True
 
 
-def get_ratings_for_collaborative_filtering(db: Session, min_ratings_per_user: int = 5):
-    """Get ratings data for collaborative filtering."""
-    from sqlalchemy import func
-    
-    # Get users with minimum ratings
-    user_counts = db.query(Rating.user_id, func.count(Rating.id).label('rating_count')).group_by(Rating.user_id).having(func.count(Rating.id) >= min_ratings_per_user).subquery()
-    
-    # Get ratings for these users
-    return db.query(Rating).join(user_counts, Rating.user_id == user_counts.c.user_id).all()
+async def invalidate_rating_cache():
+    """Drop cached recommendations, which depend on every user's ratings."""
+    await cache.invalidate("hybrid")
+
+
+async def stream_ratings_for_collaborative_filtering(
+    db: AsyncSession, min_ratings_per_user: int = 5, batch_size: int = 10000
+):
+    """Stream (user_id, movie_id, rating) rows for collaborative filtering in batches.
+
+    Only users with at least min_ratings_per_user ratings are included. Rows come
+    from a server-side cursor, so no ORM objects are built and memory stays bounded
+    by batch_size.
+    """
+    active_users = (
+        select(Rating.user_id)
+        .group_by(Rating.user_id)
+        .having(func.count(Rating.id) >= min_ratings_per_user)
+    )
+    stmt = (
+        select(Rating.user_id, Rating.movie_id, Rating.rating)
+        .where(Rating.user_id.in_(active_users))
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
@@ -1,39 +1,46 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_
 from typing import Optional
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
 from ..core.security import get_password_hash, verify_password
 
 
-def get_user(db: Session, user_id: int) -> Optional[User]:
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
     """Get user by ID."""
-    return db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    return result.scalar_one_or_none()
 
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email."""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalar_one_or_none()
 
 
-def get_user_by_username(db: Session, username: str) -> Optional[User]:
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
     """Get user by username."""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalar_one_or_none()
 
 
-def get_user_by_email_or_username(db: Session, email_or_username: str) -> Optional[User]:
+async def get_user_by_email_or_username(db: AsyncSession, email_or_username: str) -> Optional[User]:
     """Get user by email or username."""
-    return db.query(User).filter(
-        or_(User.email == email_or_username, User.username == email_or_username)
-    ).first()
+    result = await db.execute(
+        select(User).where(
+            or_(User.email == email_or_username, User.username == email_or_username)
+        )
+    )
+    return result.scalars().first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
     """Get multiple users."""
-    return db.query(User).offset(skip).limit(limit).all()
+    result = await db.execute(select(User).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
-def create_user(db: Session, user: UserCreate) -> User:
+async def create_user(db: AsyncSession, user: UserCreate) -> User:
     """Create a new user."""
     hashed_password = get_password_hash(user.password)
     db_user = User(
@@ -42,43 +49,43 @@ def create_user(db: Session, user: UserCreate) -> User:
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
-def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
+async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -> Optional[User]:
     """Update user information."""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id)
     if not db_user:
         return None
     
-    update_data = user_update.dict(exclude_unset=True)
+    update_data = user_update.model_dump(exclude_unset=True)
     if "password" in update_data:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
     
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
-def delete_user(db: Session, user_id: int) -> bool:
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
     """Delete a user."""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id)
     if not db_user:
         return False
     
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
     return True
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate user with username/email and password."""
-    user = get_user_by_email_or_username(db, username)
+    user = await get_user_by_email_or_username(db, username)
     if not user:
         return None
     if not verify_password(password, user.hashed_password):
@@ -1,16 +1,51 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from .core.config import settings
-from .core.database import engine, Base
+from .core import cache
+from .core.database import init_db, SessionLocal
+from .crud.movie import refresh_movie_rating_stats
+from .ml import collaborative
 from .api.v1 import auth, movies, ratings, recommendations
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+
+async def refresh_rating_data_periodically():
+    """Keep movie rating stats and the collaborative model current off the rating write path."""
+    while True:
+        try:
+            async with SessionLocal() as db:
+                await refresh_movie_rating_stats(db)
+                # Compares against the ratings version rather than this worker's UPDATE
+                # count, so every worker picks up new ratings, not just the one that won
+                await collaborative.refresh_collaborative_model(db)
+        except Exception as e:
+            logger.warning("Rating data refresh failed: %s", e)
+        await asyncio.sleep(settings.rating_stats_refresh_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables
+    await init_db()
+    collaborative.load_collaborative_model()
+    refresh_task = asyncio.create_task(refresh_rating_data_periodically())
+    yield
+    refresh_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await refresh_task
+    await cache.close()
+
 
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
-    description="A movie recommendation API with collaborative filtering, content-based filtering, and hybrid approaches"
+    description="A movie recommendation API with collaborative filtering, content-based filtering, and hybrid approaches",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -20,7 +55,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
@@ -30,7 +67,7 @@ app.include_router(recommendations.router, prefix="/api/v1/recommendations", tag
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     """Root endpoint."""
     return {
         "message": "Welcome to Movie Recommender API",
@@ -40,7 +77,7 @@ def read_root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
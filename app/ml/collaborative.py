@@ -1,93 +1,269 @@
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import os
+import tempfile
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix
 from sklearn.decomposition import TruncatedSVD
+from ..core import cache
+from ..core.config import settings
 from ..schemas.movie import Movie
-from ..crud.movie import get_movie
-from ..crud.rating import get_ratings_for_collaborative_filtering, get_user_ratings
+from ..crud.movie import get_movies_by_ids
+from ..crud.rating import stream_ratings_for_collaborative_filtering, get_ratings_version, get_user_ratings
+from .ranking import top_k
 
+MODEL_FILE = "collaborative.npz"
 
-def create_user_movie_matrix(db: Session):
-    """Create user-movie rating matrix."""
-    ratings = get_ratings_for_collaborative_filtering(db)
+# Process umask, read once at import (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class CollaborativeModel:
+    """User-based collaborative filtering model fitted on the rating matrix."""
     
-    # Get unique users and movies
-    users = list(set([r.user_id for r in ratings]))
-    movies = list(set([r.movie_id for r in ratings]))
+    def __init__(
+        self, user_ids: np.ndarray, movie_ids: np.ndarray, ratings: csr_matrix,
+        user_factors: np.ndarray, components: np.ndarray, ratings_version: str = ""
+    ):
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.ratings = ratings
+        self.user_factors = user_factors  # SVD-reduced, L2-normalised rows
+        self.components = components  # SVD components (k x movies), to fold in new users
+        self.ratings_version = ratings_version  # get_ratings_version() the model was trained at
+        self.user_to_idx = {int(user_id): idx for idx, user_id in enumerate(user_ids)}
+        self.movie_to_idx = {int(movie_id): idx for idx, movie_id in enumerate(movie_ids)}
+        
+        # 1 wherever a rating exists, to sum similarity weights per movie
+        self.rated = ratings.copy()
+        self.rated.data[:] = 1.0
     
-    # Create mapping
-    user_to_idx = {user_id: idx for idx, user_id in enumerate(users)}
-    movie_to_idx = {movie_id: idx for idx, movie_id in enumerate(movies)}
+    @classmethod
+    def fit(cls, user_ids: np.ndarray, movie_ids: np.ndarray, values: np.ndarray) -> Optional["CollaborativeModel"]:
+        """Fit the model from parallel arrays of rating rows; None if there is too little data."""
+        users, user_rows = np.unique(user_ids, return_inverse=True)
+        movies, movie_cols = np.unique(movie_ids, return_inverse=True)
+        ratings = csr_matrix(
+            (np.asarray(values, dtype=np.float32), (user_rows, movie_cols)), shape=(len(users), len(movies))
+        )
+        
+        n_components = min(50, min(ratings.shape) - 1)
+        if n_components < 1:
+            return None
+        
+        # Use SVD for dimensionality reduction; fixed seed so every worker fits the same model
+        svd = TruncatedSVD(n_components=n_components, random_state=0)
+        user_factors = svd.fit_transform(ratings).astype(np.float32, copy=False)
+        norms = np.linalg.norm(user_factors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return cls(users, movies, ratings, user_factors / norms, svd.components_.astype(np.float32, copy=False))
     
-    # Create matrix
-    matrix = np.zeros((len(users), len(movies)))
+    def fold_in(self, user_ratings: Dict[int, float]) -> Optional[np.ndarray]:
+        """Project a user who is not in the model into the SVD space, as TruncatedSVD.transform would.
+
+        Returns None if none of their rated movies are in the model.
+        """
+        cols = [self.movie_to_idx[m] for m in user_ratings if m in self.movie_to_idx]
+        if not cols:
+            return None
+        values = np.array([user_ratings[m] for m in user_ratings if m in self.movie_to_idx], dtype=np.float32)
+        factor = self.components[:, cols] @ values
+        norm = np.linalg.norm(factor)
+        return factor / norm if norm else factor
+    
+    def recommend(self, user_id: int, user_ratings: Dict[int, float], limit: int) -> Optional[List[int]]:
+        """Movie IDs with the highest predicted rating for a user.
+
+        user_ratings are the user's current ratings by movie ID: those movies are
+        excluded, and users who joined since training are folded in from them.
+        Returns None if the user cannot be placed in the model (none of their
+        rated movies were trained on).
+        """
+        user_idx = self.user_to_idx.get(user_id)
+        user_factor = self.user_factors[user_idx] if user_idx is not None else self.fold_in(user_ratings)
+        if user_factor is None:
+            return None
+        
+        # Cosine similarity to every user (rows are normalised), ignoring the user themselves
+        similarities = self.user_factors @ user_factor
+        if user_idx is not None:
+            similarities[user_idx] = 0.0
+        
+        # Predicted rating: similarity-weighted average of other users' ratings per movie
+        weighted_ratings = self.ratings.T @ similarities
+        total_weights = self.rated.T @ similarities
+        predictions = np.divide(
+            weighted_ratings, total_weights,
+            out=np.full_like(weighted_ratings, -np.inf), where=total_weights > 0
+        )
+        rated_idx = [self.movie_to_idx[m] for m in user_ratings if m in self.movie_to_idx]
+        predictions[rated_idx] = -np.inf
+        
+        return self.movie_ids[top_k(predictions, limit)].tolist()
     
-    for rating in ratings:
-        user_idx = user_to_idx[rating.user_id]
-        movie_idx = movie_to_idx[rating.movie_id]
-        matrix[user_idx, movie_idx] = rating.rating
+    def save(self, path: str):
+        """Write the model to an .npz file, replacing any previous one atomically.
+
+        Each write goes to its own temporary file, so workers saving at the same
+        time never interleave; the last os.replace wins.
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        f = tempfile.NamedTemporaryFile(
+            dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False
+        )
+        try:
+            with f:
+                np.savez(
+                    f,
+                    user_ids=self.user_ids,
+                    movie_ids=self.movie_ids,
+                    data=self.ratings.data,
+                    indices=self.ratings.indices,
+                    indptr=self.ratings.indptr,
+                    shape=np.array(self.ratings.shape),
+                    user_factors=self.user_factors,
+                    components=self.components,
+                    ratings_version=np.array(self.ratings_version),
+                )
+                # NamedTemporaryFile is 0600; give the model the permissions of a normal file
+                os.fchmod(f.fileno(), 0o644 & ~_UMASK)
+            os.replace(f.name, path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
     
-    return matrix, user_to_idx, movie_to_idx, users, movies
+    @classmethod
+    def load(cls, path: str) -> "CollaborativeModel":
+        """Read a model written by save()."""
+        with np.load(path) as f:
+            # float32 throughout; models saved as float64 are converted on load
+            data = f["data"].astype(np.float32, copy=False)
+            ratings = csr_matrix((data, f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            return cls(
+                f["user_ids"], f["movie_ids"], ratings,
+                f["user_factors"].astype(np.float32, copy=False), f["components"].astype(np.float32, copy=False),
+                str(f["ratings_version"]) if "ratings_version" in f.files else ""
+            )
+
+
+_model: Optional[CollaborativeModel] = None
+# Ratings version that last yielded no model (too little data), so it isn't refitted each tick
+_no_model_version: Optional[str] = None
+
+
+def get_model_path() -> str:
+    return os.path.join(settings.model_path, MODEL_FILE)
+
+
+def get_collaborative_model() -> Optional[CollaborativeModel]:
+    """Return the in-memory model, if one has been trained or loaded."""
+    return _model
 
 
-def get_collaborative_recommendations(db: Session, user_id: int, limit: int = 10) -> List[Movie]:
+def load_collaborative_model() -> Optional[CollaborativeModel]:
+    """Load the persisted model into memory (at startup)."""
+    global _model
+    path = get_model_path()
+    if os.path.exists(path):
+        try:
+            _model = CollaborativeModel.load(path)
+        except Exception as e:
+            print(f"Error loading collaborative model: {e}")
+    return _model
+
+
+async def refresh_collaborative_model(db: AsyncSession) -> Optional[CollaborativeModel]:
+    """Bring this worker's model up to date with the ratings table.
+
+    Workers share the saved model file: if another worker has already trained on
+    the current ratings it is reloaded from disk, otherwise the model is retrained.
+    """
+    global _model
+    version = str(await get_ratings_version(db))
+    if _model is not None and _model.ratings_version == version:
+        return _model
+    if _model is None and _no_model_version == version:
+        return None
+    
+    path = get_model_path()
+    if os.path.exists(path):
+        try:
+            saved = await asyncio.to_thread(CollaborativeModel.load, path)
+            if saved.ratings_version == version:
+                _model = saved
+                await cache.invalidate("hybrid")
+                return _model
+        except Exception as e:
+            print(f"Error loading collaborative model: {e}")
+    return await train_collaborative_model(db)
+
+
+async def train_collaborative_model(db: AsyncSession) -> Optional[CollaborativeModel]:
+    """Fit the model on current ratings, keep it in memory and persist it."""
+    global _model, _no_model_version
+    # Read before streaming, so ratings added meanwhile trigger another refresh
+    version = str(await get_ratings_version(db))
+    user_ids, movie_ids, values = [], [], []
+    async for rows in stream_ratings_for_collaborative_filtering(db, settings.min_ratings_per_user):
+        batch_users, batch_movies, batch_values = zip(*rows)
+        user_ids.append(np.array(batch_users, dtype=np.int32))
+        movie_ids.append(np.array(batch_movies, dtype=np.int32))
+        values.append(np.array(batch_values, dtype=np.float32))
+    if not user_ids:
+        _model = None
+        _no_model_version = version
+        return None
+    
+    # Fitting is CPU-bound; keep it off the event loop
+    _model = await asyncio.to_thread(
+        CollaborativeModel.fit, np.concatenate(user_ids), np.concatenate(movie_ids), np.concatenate(values)
+    )
+    if _model is not None:
+        _model.ratings_version = version
+        try:
+            await asyncio.to_thread(_model.save, get_model_path())
+        except OSError as e:
+            print(f"Error saving collaborative model: {e}")
+        # Only a newly installed model changes hybrid results
+        await cache.invalidate("hybrid")
+    else:
+        _no_model_version = version
+    return _model
+
+
+async def get_collaborative_recommendations(db: AsyncSession, user_id: int, limit: int = 10) -> List[Movie]:
     """Get collaborative filtering recommendations for a user."""
     try:
-        matrix, user_to_idx, movie_to_idx, users, movies = create_user_movie_matrix(db)
+        # Training is left to the lifespan refresh task; until it produces a model,
+        # requests get the popular-movies fallback below
+        model = get_collaborative_model()
         
-        if user_id not in user_to_idx:
+        # Current ratings: excluded from results even if made since the model was trained
+        user_ratings = await get_user_ratings(db, user_id)
+        known_user = model is not None and user_id in model.user_to_idx
+        
+        if model is None or (not known_user and len(user_ratings) < settings.min_ratings_per_user):
             # User has no ratings, return popular movies
             from ..crud.movie import get_top_rated_movies
-            return get_top_rated_movies(db, limit=limit)
-        
-        user_idx = user_to_idx[user_id]
-        
-        # Use SVD for dimensionality reduction
-        svd = TruncatedSVD(n_components=min(50, min(matrix.shape) - 1))
-        matrix_reduced = svd.fit_transform(matrix)
-        
-        # Calculate user similarities
-        user_similarities = cosine_similarity([matrix_reduced[user_idx]], matrix_reduced)[0]
+            return await get_top_rated_movies(db, limit=limit)
         
-        # Get user's rated movies
-        user_ratings = get_user_ratings(db, user_id)
-        rated_movie_ids = set([r.movie_id for r in user_ratings])
-        
-        # Calculate predicted ratings for unrated movies
-        predictions = []
-        for movie_id in movies:
-            if movie_id not in rated_movie_ids:
-                movie_idx = movie_to_idx[movie_id]
-                
-                # Find similar users who rated this movie
-                similar_users = []
-                for other_user_idx, similarity in enumerate(user_similarities):
-                    if other_user_idx != user_idx and matrix[other_user_idx, movie_idx] > 0:
-                        similar_users.append((similarity, matrix[other_user_idx, movie_idx]))
-                
-                if similar_users:
-                    # Weighted average of similar users' ratings
-                    total_weight = sum([sim for sim, _ in similar_users])
-                    if total_weight > 0:
-                        predicted_rating = sum([sim * rating for sim, rating in similar_users]) / total_weight
-                        predictions.append((movie_id, predicted_rating))
-        
-        # Sort by predicted rating and get top recommendations
-        predictions.sort(key=lambda x: x[1], reverse=True)
-        recommended_movie_ids = [movie_id for movie_id, _ in predictions[:limit]]
+        # Score off the event loop; the matrix products release the GIL
+        recommended_movie_ids = await asyncio.to_thread(
+            model.recommend, user_id, {r.movie_id: r.rating for r in user_ratings}, limit
+        )
+        if recommended_movie_ids is None:
+            # None of the user's rated movies were in the training data
+            from ..crud.movie import get_top_rated_movies
+            return await get_top_rated_movies(db, limit=limit)
         
         # Get movie objects
-        recommended_movies = []
-        for movie_id in recommended_movie_ids:
-            movie = get_movie(db, movie_id)
-            if movie:
-                recommended_movies.append(movie)
-        
-        return recommended_movies
+        return await get_movies_by_ids(db, recommended_movie_ids)
     
     except Exception as e:
         print(f"Error in collaborative filtering: {e}")
         # Fallback to popular movies
         from ..crud.movie import get_top_rated_movies
-        return get_top_rated_movies(db, limit=limit)
+        return await get_top_rated_movies(db, limit=limit)
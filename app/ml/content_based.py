@@ -1,137 +1,198 @@
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from ..schemas.movie import Movie
-from ..crud.movie import get_movie, get_movies
+from ..crud.movie import (
+    get_movies, get_movies_by_ids, get_movies_version, get_precomputed_similar_movies, replace_movie_similarities
+)
 from ..crud.rating import get_user_ratings
+from .ranking import top_k
 
+# Neighbours stored per movie by build_movie_similarities
+SIMILAR_MOVIES_TOP_K = 50
 
-def create_movie_features(db: Session):
-    """Create TF-IDF features for movies based on title, description, genre, and director."""
-    movies = get_movies(db)
+
+class FeatureStore:
+    """TF-IDF features for every movie, fitted on title, description, genre, and director."""
     
-    # Create text features for each movie
-    movie_texts = []
-    movie_ids = []
+    def __init__(self, version: tuple, tfidf_matrix: csr_matrix, movie_ids: List[int], vectorizer: TfidfVectorizer):
+        self.version = version  # get_movies_version() at fit time
+        self.tfidf_matrix = tfidf_matrix  # CSR, L2-normalised rows: dot products are cosine similarities
+        self.movie_ids = movie_ids
+        self.movie_to_idx = {movie_id: idx for idx, movie_id in enumerate(movie_ids)}
+        self.vectorizer = vectorizer
     
-    for movie in movies:
-        text_parts = []
-        if movie.title:
-            text_parts.append(movie.title)
-        if movie.description:
-            text_parts.append(movie.description)
-        if movie.genre:
-            text_parts.append(movie.genre)
-        if movie.director:
-            text_parts.append(movie.director)
-        
-        movie_text = " ".join(text_parts)
-        movie_texts.append(movie_text)
-        movie_ids.append(movie.id)
+    @classmethod
+    def fit(cls, version: tuple, movies: List[Movie]) -> "FeatureStore":
+        """Fit TF-IDF features for the given movies."""
+        # Create text features for each movie
+        movie_texts = []
+        movie_ids = []
+        
+        for movie in movies:
+            text_parts = []
+            if movie.title:
+                text_parts.append(movie.title)
+            if movie.description:
+                text_parts.append(movie.description)
+            if movie.genre:
+                text_parts.append(movie.genre)
+            if movie.director:
+                text_parts.append(movie.director)
+            
+            movie_text = " ".join(text_parts)
+            movie_texts.append(movie_text)
+            movie_ids.append(movie.id)
+        
+        # Create TF-IDF matrix
+        vectorizer = TfidfVectorizer(stop_words='english', max_features=1000, norm='l2', dtype=np.float32)
+        tfidf_matrix = vectorizer.fit_transform(movie_texts)
+        return cls(version, tfidf_matrix, movie_ids, vectorizer)
     
-    # Create TF-IDF matrix
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-    tfidf_matrix = vectorizer.fit_transform(movie_texts)
+    def recommend(self, user_ratings: Dict[int, float], limit: int) -> List[int]:
+        """Movie IDs most similar to the rating-weighted average of a user's rated movies.
+
+        user_ratings are the user's ratings by movie ID; those movies are excluded.
+        """
+        # Get user's preferences: rating-weighted average of their movies' TF-IDF rows
+        rated = [(self.movie_to_idx[m], rating) for m, rating in user_ratings.items() if m in self.movie_to_idx]
+        user_preferences = np.zeros(self.tfidf_matrix.shape[1], dtype=np.float32)
+        if rated:
+            cols, weights = zip(*rated)
+            weights = np.array(weights, dtype=np.float32)
+            weight_vector = csr_matrix(
+                (weights, (np.zeros(len(cols), dtype=int), cols)), shape=(1, len(self.movie_ids))
+            )
+            user_preferences = (weight_vector @ self.tfidf_matrix).toarray().ravel() / weights.sum()
+        
+        # Calculate similarities between user preferences and all movies
+        similarities = self.tfidf_matrix @ user_preferences
+        norm = np.linalg.norm(user_preferences)
+        if norm > 0:
+            similarities /= norm
+        
+        # Find unrated movies with highest similarity
+        if rated:
+            similarities[list(cols)] = -np.inf
+        return [self.movie_ids[i] for i in top_k(similarities, limit)]
+
+
+# Features from the last fit, shared by every content-based entry point
+_features: Optional[FeatureStore] = None
+# Serialises refits so concurrent requests that see a new version fit only once
+_features_lock = asyncio.Lock()
+
+
+async def get_feature_store(db: AsyncSession) -> FeatureStore:
+    """Get the movie TF-IDF features, refitting only when the movies table has changed."""
+    global _features
+    version = await get_movies_version(db)
+    if _features is not None and _features.version == version:
+        return _features
     
-    return tfidf_matrix, movie_ids, vectorizer
+    async with _features_lock:
+        # Another request may have refitted while this one waited
+        if _features is None or _features.version != version:
+            movies = await get_movies(db, limit=None)
+            # Fitting TF-IDF over every movie is CPU-bound; keep it off the event loop
+            _features = await asyncio.to_thread(FeatureStore.fit, version, movies)
+        return _features
 
 
-def get_content_based_recommendations(db: Session, user_id: int, limit: int = 10) -> List[Movie]:
+async def get_content_based_recommendations(db: AsyncSession, user_id: int, limit: int = 10) -> List[Movie]:
     """Get content-based recommendations for a user."""
     try:
         # Get user's rated movies
-        user_ratings = get_user_ratings(db, user_id)
+        user_ratings = await get_user_ratings(db, user_id)
         
         if not user_ratings:
             # User has no ratings, return popular movies
             from ..crud.movie import get_top_rated_movies
-            return get_top_rated_movies(db, limit=limit)
-        
-        # Create movie features
-        tfidf_matrix, movie_ids, vectorizer = create_movie_features(db)
-        
-        # Get user's preferences (weighted by rating)
-        user_preferences = np.zeros(tfidf_matrix.shape[1])
-        total_weight = 0
-        
-        for rating in user_ratings:
-            if rating.movie_id in movie_ids:
-                movie_idx = movie_ids.index(rating.movie_id)
-                weight = rating.rating  # Use rating as weight
-                user_preferences += weight * tfidf_matrix[movie_idx].toarray().flatten()
-                total_weight += weight
-        
-        if total_weight > 0:
-            user_preferences /= total_weight
+            return await get_top_rated_movies(db, limit=limit)
         
-        # Calculate similarities between user preferences and all movies
-        similarities = cosine_similarity([user_preferences], tfidf_matrix)[0]
-        
-        # Get user's rated movie IDs
-        rated_movie_ids = set([r.movie_id for r in user_ratings])
-        
-        # Find unrated movies with highest similarity
-        movie_similarities = []
-        for i, movie_id in enumerate(movie_ids):
-            if movie_id not in rated_movie_ids:
-                movie_similarities.append((movie_id, similarities[i]))
-        
-        # Sort by similarity and get top recommendations
-        movie_similarities.sort(key=lambda x: x[1], reverse=True)
-        recommended_movie_ids = [movie_id for movie_id, _ in movie_similarities[:limit]]
+        # Get movie features and score them off the event loop
+        features = await get_feature_store(db)
+        recommended_movie_ids = await asyncio.to_thread(
+            features.recommend, {r.movie_id: r.rating for r in user_ratings}, limit
+        )
         
         # Get movie objects
-        recommended_movies = []
-        for movie_id in recommended_movie_ids:
-            movie = get_movie(db, movie_id)
-            if movie:
-                recommended_movies.append(movie)
-        
-        return recommended_movies
+        return await get_movies_by_ids(db, recommended_movie_ids)
     
     except Exception as e:
         print(f"Error in content-based filtering: {e}")
         # Fallback to popular movies
         from ..crud.movie import get_top_rated_movies
-        return get_top_rated_movies(db, limit=limit)
+        return await get_top_rated_movies(db, limit=limit)
 
 
-def get_similar_movies(db: Session, movie_id: int, limit: int = 10) -> List[Movie]:
-    """Get movies similar to a given movie."""
+async def get_similar_movies(db: AsyncSession, movie_id: int, limit: int = 10) -> List[Movie]:
+    """Get movies similar to a given movie.
+
+    Reads the precomputed neighbours; movies not covered by the last
+    build_movie_similarities run, and limits above the SIMILAR_MOVIES_TOP_K
+    neighbours stored per movie, are scored on the fly.
+    """
     try:
-        # Create movie features
-        tfidf_matrix, movie_ids, vectorizer = create_movie_features(db)
+        if limit <= SIMILAR_MOVIES_TOP_K:
+            similar_movies = await get_precomputed_similar_movies(db, movie_id, limit)
+            if similar_movies:
+                return similar_movies
+        
+        # Get movie features
+        features = await get_feature_store(db)
+        tfidf_matrix, movie_ids, movie_to_idx = features.tfidf_matrix, features.movie_ids, features.movie_to_idx
         
-        if movie_id not in movie_ids:
+        movie_idx = movie_to_idx.get(movie_id)
+        if movie_idx is None:
             return []
         
-        movie_idx = movie_ids.index(movie_id)
         movie_vector = tfidf_matrix[movie_idx]
         
         # Calculate similarities with all other movies
-        similarities = cosine_similarity(movie_vector, tfidf_matrix)[0]
+        similarities = (tfidf_matrix @ movie_vector.T).toarray().ravel()
         
         # Get top similar movies (excluding the movie itself)
-        movie_similarities = []
-        for i, other_movie_id in enumerate(movie_ids):
-            if other_movie_id != movie_id:
-                movie_similarities.append((other_movie_id, similarities[i]))
-        
-        # Sort by similarity and get top recommendations
-        movie_similarities.sort(key=lambda x: x[1], reverse=True)
-        similar_movie_ids = [movie_id for movie_id, _ in movie_similarities[:limit]]
+        similarities[movie_idx] = -np.inf
+        similar_movie_ids = [movie_ids[i] for i in top_k(similarities, limit)]
         
         # Get movie objects
-        similar_movies = []
-        for similar_movie_id in similar_movie_ids:
-            movie = get_movie(db, similar_movie_id)
-            if movie:
-                similar_movies.append(movie)
-        
-        return similar_movies
+        return await get_movies_by_ids(db, similar_movie_ids)
     
     except Exception as e:
         print(f"Error finding similar movies: {e}")
         return []
+
+
+async def build_movie_similarities(
+    db: AsyncSession, per_movie: int = SIMILAR_MOVIES_TOP_K, batch_size: int = 1000
+) -> int:
+    """Precompute every movie's per_movie most similar movies into movie_similarities.
+
+    Meant to run as a periodic batch job; returns the number of rows stored.
+    Rows are computed and inserted batch_size movies at a time, so memory stays
+    bounded by the batch rather than the catalogue.
+    """
+    features = await get_feature_store(db)
+    tfidf_matrix, movie_ids = features.tfidf_matrix, features.movie_ids
+    k = min(per_movie, len(movie_ids) - 1)
+    return await replace_movie_similarities(db, _similarity_batches(tfidf_matrix, movie_ids, k, batch_size))
+
+
+def _similarity_batches(tfidf_matrix: csr_matrix, movie_ids: List[int], k: int, batch_size: int):
+    """Yield each batch of movies' k nearest neighbours as movie_similarities rows."""
+    for start in range(0, len(movie_ids) if k > 0 else 0, batch_size):
+        # TF-IDF rows are L2-normalised, so dot products are cosine similarities
+        scores = (tfidf_matrix[start:start + batch_size] @ tfidf_matrix.T).toarray()
+        batch_rows = np.arange(scores.shape[0])
+        scores[batch_rows, start + batch_rows] = -np.inf  # exclude the movie itself
+        
+        neighbours = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        yield [
+            {"movie_id": movie_ids[start + row], "neighbor_id": movie_ids[n], "score": float(scores[row, n])}
+            for row, row_neighbours in enumerate(neighbours)
+            for n in row_neighbours
+        ]
@@ -1,16 +1,45 @@
-from sqlalchemy.orm import Session
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+import numpy as np
+import orjson
+from ..core import cache
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.movie import get_movies_by_ids
 from ..schemas.movie import Movie
 from .collaborative import get_collaborative_recommendations
 from .content_based import get_content_based_recommendations
+from .ranking import top_k
 
 
-def get_hybrid_recommendations(db: Session, user_id: int, limit: int = 10) -> List[Movie]:
-    """Get hybrid recommendations combining collaborative and content-based filtering."""
+async def get_hybrid_recommendations(db: AsyncSession, user_id: int, limit: int = 10) -> List[Movie]:
+    """Get hybrid recommendations combining collaborative and content-based filtering.
+
+    The ranked movie IDs are cached per user and limit until ratings, movies or the
+    collaborative model change; a hit costs one cache read and one IN query.
+    """
+    key = f"{user_id}:limit={limit}"
+    cached = await cache.get("hybrid", key)
+    if cached is not None:
+        return await get_movies_by_ids(db, orjson.loads(cached))
+    
+    movies = await _blend_recommendations(db, user_id, limit)
+    await cache.set(
+        "hybrid", key, orjson.dumps([movie.id for movie in movies]), expire=settings.recommendation_cache_seconds
+    )
+    return movies
+
+
+async def _blend_recommendations(db: AsyncSession, user_id: int, limit: int) -> List[Movie]:
+    """Blend collaborative and content-based rankings with 0.6 / 0.4 weights."""
     try:
-        # Get recommendations from both methods
-        collaborative_recs = get_collaborative_recommendations(db, user_id, limit * 2)
-        content_based_recs = get_content_based_recommendations(db, user_id, limit * 2)
+        # Get recommendations from both methods concurrently, content-based on its own session
+        async with SessionLocal() as content_db:
+            collaborative_recs, content_based_recs = await asyncio.gather(
+                get_collaborative_recommendations(db, user_id, limit * 2),
+                get_content_based_recommendations(content_db, user_id, limit * 2)
+            )
         
         # Create movie ID sets for easy lookup
         collaborative_ids = set([movie.id for movie in collaborative_recs])
@@ -42,16 +71,12 @@ def get_hybrid_recommendations(db: Session, user_id: int, limit: int = 10) -> Li
                     'source': 'content_based'
                 }
         
-        # Sort by combined score and return top recommendations
-        sorted_movies = sorted(
-            hybrid_movies.values(),
-            key=lambda x: x['score'],
-            reverse=True
-        )
-        
-        return [item['movie'] for item in sorted_movies[:limit]]
+        # Rank by combined score and return top recommendations
+        candidates = list(hybrid_movies.values())
+        scores = np.array([item['score'] for item in candidates], dtype=float)
+        return [candidates[i]['movie'] for i in top_k(scores, limit)]
     
     except Exception as e:
         print(f"Error in hybrid recommendations: {e}")
         # Fallback to collaborative filtering
-        return get_collaborative_recommendations(db, user_id, limit)
+        return await get_collaborative_recommendations(db, user_id, limit)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Index, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -6,11 +6,23 @@ from ..core.database import Base
 
 class Movie(Base):
     __tablename__ = "movies"
+    __table_args__ = (
+        # Trigram index for substring / typo-tolerant title lookups (pg_trgm)
+        Index(
+            "movies_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # Filtered listings paginate by id within the filter
+        Index("ix_movies_genre", "genre", "id"),
+        Index("ix_movies_year", "year", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     description = Column(Text)
-    genre = Column(String, index=True)
+    genre = Column(String)
     director = Column(String)
     year = Column(Integer)
     duration = Column(Integer)  # in minutes
@@ -20,4 +32,31 @@ class Movie(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    ratings = relationship("Rating", back_populates="movie")
+    ratings = relationship("Rating", back_populates="movie", lazy="raise")
+
+
+# Partial index matching get_top_rated_movies (total_ratings > 0 ORDER BY average_rating DESC)
+Index(
+    "ix_movies_top_rated",
+    Movie.average_rating.desc(),
+    postgresql_where=Movie.total_ratings > 0,
+    sqlite_where=Movie.total_ratings > 0,
+)
+
+
+def _search_text(column):
+    return func.coalesce(column, literal_column("''"))
+
+
+# Full-text search document (PostgreSQL). Queries must use this exact
+# expression, otherwise the planner cannot match it to the GIN index.
+search_vector = func.to_tsvector(
+    literal_column("'english'"),
+    _search_text(Movie.title) + literal_column("' '")
+    + _search_text(Movie.description) + literal_column("' '")
+    + _search_text(Movie.director)
+)
+
+Movie.__table__.append_constraint(
+    Index("movies_search_tsv_idx", search_vector, postgresql_using="gin").ddl_if(dialect="postgresql")
+)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, Index
+from ..core.database import Base
+
+
+class MovieSimilarity(Base):
+    """Precomputed content-based nearest neighbours, rebuilt by a batch job."""
+    __tablename__ = "movie_similarities"
+    __table_args__ = (
+        Index("ix_movie_similarities_movie_score", "movie_id", "score"),
+    )
+
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -6,6 +6,15 @@ from ..core.database import Base
 
 class Rating(Base):
     __tablename__ = "ratings"
+    __table_args__ = (
+        # One rating per user and movie; the conflict target of crud.rating.create_if_absent
+        Index("ix_ratings_user_movie", "user_id", "movie_id", unique=True),
+        # Per-user and per-movie listings paginate by id
+        Index("ix_ratings_user", "user_id", "id"),
+        Index("ix_ratings_movie", "movie_id", "id"),
+        # Covers the per-movie average, count and distribution without touching the table
+        Index("ix_ratings_movie_rating", "movie_id", "rating"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -16,5 +25,5 @@ class Rating(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    user = relationship("User", back_populates="ratings")
-    movie = relationship("Movie", back_populates="ratings")
+    user = relationship("User", back_populates="ratings", lazy="raise")
+    movie = relationship("Movie", back_populates="ratings", lazy="raise")
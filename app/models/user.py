@@ -16,4 +16,4 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    ratings = relationship("Rating", back_populates="user")
+    ratings = relationship("Rating", back_populates="user", lazy="raise")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 
@@ -32,14 +32,27 @@ class MovieInDB(MovieBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Movie(MovieInDB):
     pass
 
 
+class MovieList(BaseModel):
+    """Compact movie representation for list endpoints (no description/timestamps)."""
+    id: int
+    title: str
+    genre: Optional[str] = None
+    director: Optional[str] = None
+    year: Optional[int] = None
+    duration: Optional[int] = None
+    average_rating: float
+    total_ratings: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class MovieSearch(BaseModel):
     query: str
     genre: Optional[str] = None
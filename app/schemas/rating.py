@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime
+from .movie import Movie
 
 
 class RatingBase(BaseModel):
@@ -24,8 +25,7 @@ class RatingInDB(RatingBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Rating(RatingInDB):
@@ -33,7 +33,7 @@ class Rating(RatingInDB):
 
 
 class RatingWithMovie(Rating):
-    movie: dict  # Will be populated with movie details
+    movie: Movie
 
 
 class RatingWithUser(Rating):
@@ -1,13 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import random
 from ..models.movie import Movie
 from ..models.user import User
 from ..models.rating import Rating
 from ..core.security import get_password_hash
+from ..core.database import SessionLocal, is_postgresql
 
 
-def load_sample_movies(db: Session) -> List[Movie]:
+async def load_sample_movies(db: AsyncSession) -> List[Movie]:
     """Load sample movies into the database."""
     sample_movies = [
         {
@@ -95,17 +98,18 @@ def load_sample_movies(db: Session) -> List[Movie]:
     created_movies = []
     for movie_data in sample_movies:
         # Check if movie already exists
-        existing_movie = db.query(Movie).filter(Movie.title == movie_data["title"]).first()
+        result = await db.execute(select(Movie).where(Movie.title == movie_data["title"]))
+        existing_movie = result.scalars().first()
         if not existing_movie:
             movie = Movie(**movie_data)
             db.add(movie)
             created_movies.append(movie)
     
-    db.commit()
+    await db.commit()
     return created_movies
 
 
-def load_sample_users(db: Session) -> List[User]:
+async def load_sample_users(db: AsyncSession) -> List[User]:
     """Load sample users into the database."""
     sample_users = [
         {"email": "alice@example.com", "username": "alice", "password": "password123"},
@@ -118,7 +122,8 @@ def load_sample_users(db: Session) -> List[User]:
     created_users = []
     for user_data in sample_users:
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data["email"]).first()
+        result = await db.execute(select(User).where(User.email == user_data["email"]))
+        existing_user = result.scalars().first()
         if not existing_user:
             user = User(
                 email=user_data["email"],
@@ -128,61 +133,63 @@ def load_sample_users(db: Session) -> List[User]:
             db.add(user)
             created_users.append(user)
     
-    db.commit()
+    await db.commit()
     return created_users
 
 
-def load_sample_ratings(db: Session) -> List[Rating]:
+async def load_sample_ratings(db: AsyncSession) -> List[Rating]:
     """Load sample ratings into the database."""
     # Get all users and movies
-    users = db.query(User).all()
-    movies = db.query(Movie).all()
+    users = (await db.execute(select(User))).scalars().all()
+    movies = (await db.execute(select(Movie))).scalars().all()
     
     if not users or not movies:
         return []
     
-    created_ratings = []
+    # Each user rates 3-7 random movies
+    rows = [
+        {
+            "user_id": user.id,
+            "movie_id": movie.id,
+            "rating": round(random.uniform(2.0, 5.0), 1),
+            "review": f"Sample review for {movie.title}"
+        }
+        for user in users
+        for movie in random.sample(movies, min(random.randint(3, 7), len(movies)))
+    ]
     
-    # Generate random ratings for each user
-    for user in users:
-        # Each user rates 3-7 random movies
-        num_ratings = random.randint(3, 7)
-        rated_movies = random.sample(movies, min(num_ratings, len(movies)))
-        
-        for movie in rated_movies:
-            # Check if rating already exists
-            existing_rating = db.query(Rating).filter(
-                Rating.user_id == user.id,
-                Rating.movie_id == movie.id
-            ).first()
-            
-            if not existing_rating:
-                rating_value = round(random.uniform(2.0, 5.0), 1)
-                rating = Rating(
-                    user_id=user.id,
-                    movie_id=movie.id,
-                    rating=rating_value,
-                    review=f"Sample review for {movie.title}"
-                )
-                db.add(rating)
-                created_ratings.append(rating)
+    # One multi-row insert; ratings that already exist are skipped by the unique index
+    insert = postgresql.insert if is_postgresql(db) else sqlite.insert
+    result = await db.execute(
+        insert(Rating)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+        .returning(Rating)
+    )
+    created_ratings = result.scalars().all()
     
-    db.commit()
+    await db.commit()
     return created_ratings
 
 
-def load_all_sample_data(db: Session):
+async def load_all_sample_data(db: AsyncSession):
     """Load all sample data into the database."""
     print("Loading sample movies...")
-    movies = load_sample_movies(db)
+    movies = await load_sample_movies(db)
     print(f"Loaded {len(movies)} movies")
     
     print("Loading sample users...")
-    users = load_sample_users(db)
+    users = await load_sample_users(db)
     print(f"Loaded {len(users)} users")
     
     print("Loading sample ratings...")
-    ratings = load_sample_ratings(db)
+    ratings = await load_sample_ratings(db)
     print(f"Loaded {len(ratings)} ratings")
     
     return {"movies": movies, "users": users, "ratings": ratings}
+
+
+async def load_sample_data():
+    """Open a session and load all sample data into the database."""
+    async with SessionLocal() as db:
+        return await load_all_sample_data(db)
@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Optional, Sequence
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last seen row ID into an opaque pagination cursor."""
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a pagination cursor back into the last seen row ID."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(payload["id"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """Build the cursor for the next page, or None if this was the last page."""
+    if limit <= 0 or len(items) < limit:
+        return None
+    return encode_cursor(items[-1].id)
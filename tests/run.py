@@ -90,6 +90,24 @@ def setup():
     asyncio.run(_setup())
 
 
+@cli.command()
+@click.option("--top-k", default=50, help="Neighbours to store per movie")
+def build_similarities(top_k):
+    """Precompute similar movies (run periodically, e.g. nightly from cron)"""
+    from app.core.database import SessionLocal
+    from app.ml.content_based import build_movie_similarities
+    
+    click.echo("🧮 Computing movie similarities...")
+    
+    async def _build():
+        await init_db()
+        async with SessionLocal() as db:
+            count = await build_movie_similarities(db, per_movie=top_k)
+        click.echo(f"✅ Stored {count} movie similarities!")
+    
+    asyncio.run(_build())
+
+
 @cli.command()
 @click.option("--coverage", is_flag=True, help="Run with coverage report")
 @click.option("--verbose", "-v", is_flag=True, help="Verbose output")